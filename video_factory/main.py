@@ -4,6 +4,7 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -15,6 +16,10 @@ from src.pexels_client import PexelsClient
 from src.tts_engine import tts_factory
 from src.video_renderer import VideoRenderer
 
+MAX_CONCURRENT_DOWNLOADS = 8
+# libyaml's C loader is much faster than the pure-Python one; fall back when it is unavailable.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def setup_logging() -> None:
     """Configure application logging."""
@@ -25,9 +30,14 @@ def setup_logging() -> None:
 
 
 def load_settings(settings_path: Path) -> Dict[str, Any]:
-    """Load YAML settings file."""
+    """Load YAML settings file, reusing the parsed result until the file changes."""
+    return _load_settings_cached(settings_path, settings_path.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _load_settings_cached(settings_path: Path, mtime_ns: int) -> Dict[str, Any]:
     with settings_path.open("r", encoding="utf-8") as file:
-        return yaml.safe_load(file)
+        return yaml.load(file, Loader=YAML_LOADER)
 
 
 def load_channels(channels_path: Path) -> List[Dict[str, Any]]:
@@ -52,6 +62,42 @@ async def generate_audio(
         raise
 
 
+async def download_photos(client: PexelsClient, photos: List[Dict[str, Any]], assets_dir: Path) -> None:
+    """Download Pexels photos concurrently into the assets directory."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+    async def _download(url: str, destination: Path) -> None:
+        async with semaphore:
+            await asyncio.to_thread(client.download_photo, url, destination)
+
+    downloads = []
+    for index, photo in enumerate(photos, start=1):
+        src = photo.get("src", {})
+        image_url = src.get("large") or src.get("original")
+        if not image_url:
+            continue
+        downloads.append(_download(image_url, assets_dir / f"pexels_{index:02d}.jpg"))
+    await asyncio.gather(*downloads)
+
+
+async def fetch_assets(asset_manager: AssetManager, assets_settings: Dict[str, Any]) -> List[Path]:
+    """Return render-ready images, downloading them from Pexels when none exist."""
+    images = asset_manager.list_images()
+    if not images and assets_settings.get("auto_generate", False):
+        theme = assets_settings.get("theme")
+        api_key = assets_settings.get("pexels_api_key")
+        per_page = assets_settings.get("pexels_per_page", 6)
+        if theme and api_key:
+            with PexelsClient(api_key=api_key) as client:
+                photos = await asyncio.to_thread(client.search_photos, query=theme, per_page=per_page)
+                await download_photos(client, photos, asset_manager.assets_dir)
+        else:
+            logging.warning("[ASSETS] Auto-generate enabled but theme or API key missing.")
+        images = asset_manager.list_images()
+
+    return await asyncio.to_thread(asset_manager.prepare_images, images)
+
+
 def build_prompt(channel_name: str, theme: str | None = None) -> str:
     """Build a default prompt for the LLM."""
     if theme:
@@ -73,78 +119,88 @@ async def run() -> None:
         logging.error("[CONFIG] No channels configured.")
         return
 
-    channel = channels[0]
     provider_name = settings.get("tts_provider_active", "edge").lower()
 
     paths = settings.get("paths", {})
+    video_settings = settings.get("video", {})
     asset_manager = AssetManager(
         assets_dir=paths.get("assets_dir", "./assets"),
         output_dir=paths.get("output_dir", "./output"),
         temp_dir=paths.get("temp_dir", "./temp"),
+        resolution=video_settings.get("resolution", "1080p"),
     )
     asset_manager.ensure_directories()
 
     assets_settings = settings.get("assets", {})
-    images = asset_manager.list_images()
-    if not images and assets_settings.get("auto_generate", False):
-        theme = assets_settings.get("theme")
-        api_key = assets_settings.get("pexels_api_key")
-        per_page = assets_settings.get("pexels_per_page", 6)
-        if theme and api_key:
-            client = PexelsClient(api_key=api_key)
-            photos = client.search_photos(query=theme, per_page=per_page)
-            for index, photo in enumerate(photos, start=1):
-                src = photo.get("src", {})
-                image_url = src.get("large") or src.get("original")
-                if not image_url:
-                    continue
-                filename = f"pexels_{index:02d}.jpg"
-                client.download_photo(image_url, asset_manager.assets_dir / filename)
-        else:
+    # Settings-only failures are reported before any LLM, TTS or Pexels work starts.
+    if not asset_manager.list_images():
+        if not assets_settings.get("auto_generate", False):
+            logging.warning("[ASSETS] No images found. Add assets to proceed.")
+            return
+        if not (assets_settings.get("theme") and assets_settings.get("pexels_api_key")):
             logging.warning("[ASSETS] Auto-generate enabled but theme or API key missing.")
+            return
 
-        images = asset_manager.list_images()
+    llm_settings = build_llm_settings(settings, base_dir)
+    llm_engine = LLMEngine(**llm_settings)
 
+    tts_provider = tts_factory(settings)
+    voice_ids = []
+    for channel in channels:
+        voice_id = channel.get("voice_ids", {}).get(provider_name, "")
+        if not voice_id:
+            raise ValueError(f"No voice ID configured for provider: {provider_name} (channel {channel['name']})")
+        voice_ids.append(voice_id)
+
+    prompts = [build_prompt(channel["name"], assets_settings.get("theme")) for channel in channels]
+    audio_paths = [asset_manager.build_temp_path(f"{channel['name']}_narration.mp3") for channel in channels]
+
+    # Asset downloads overlap with LLM inference; TTS starts as soon as the scripts are ready.
+    download_task = asyncio.create_task(fetch_assets(asset_manager, assets_settings))
+    llm_task = asyncio.create_task(llm_engine.generate_scripts(prompts, return_exceptions=True))
+
+    async def narrate() -> List[int]:
+        """Narrate every channel whose script was generated and return their indexes."""
+        scripts = await llm_task
+        ready = []
+        for index, (channel, script_text) in enumerate(zip(channels, scripts)):
+            if isinstance(script_text, BaseException):
+                logging.error("[LLM] Skipping channel %s: %s", channel["name"], script_text)
+            else:
+                ready.append(index)
+        await asyncio.gather(
+            *(
+                generate_audio(
+                    tts_provider_name=provider_name,
+                    tts_provider=tts_provider,
+                    text=scripts[index],
+                    voice_id=voice_ids[index],
+                    output_path=audio_paths[index],
+                )
+                for index in ready
+            )
+        )
+        return ready
+
+    images, narrated = await asyncio.gather(download_task, narrate())
+    if not narrated:
+        return
     if not images:
         logging.warning("[ASSETS] No images found. Add assets to proceed.")
         return
 
-    llm_settings = build_llm_settings(settings)
-    llm_engine = LLMEngine(**llm_settings)
-
-    prompt = build_prompt(channel["name"], assets_settings.get("theme"))
-    try:
-        script_text = llm_engine.generate_script(prompt)
-    except RuntimeError as exc:
-        logging.error("[LLM] %s", exc)
-        return
-
-    tts_provider = tts_factory(str(settings_path))
-    voice_id = channel.get("voice_ids", {}).get(provider_name, "")
-    if not voice_id:
-        raise ValueError(f"No voice ID configured for provider: {provider_name}")
-
-    audio_path = asset_manager.build_temp_path("narration.mp3")
-    await generate_audio(
-        tts_provider_name=provider_name,
-        tts_provider=tts_provider,
-        text=script_text,
-        voice_id=voice_id,
-        output_path=audio_path,
-    )
-
-    video_settings = settings.get("video", {})
     renderer = VideoRenderer(
         resolution=video_settings.get("resolution", "1080p"),
         fps=video_settings.get("fps", 30),
         image_duration=video_settings.get("image_duration_seconds", 3),
     )
-    output_path = asset_manager.build_output_path("final_video.mp4")
-    try:
-        renderer.render(images=images, audio_path=audio_path, output_path=output_path)
-    except Exception as exc:
-        logging.exception("[VIDEO] Failed to render video: %s", exc)
-        raise
+    for index in narrated:
+        output_path = asset_manager.build_output_path(f"{channels[index]['name']}.mp4")
+        try:
+            renderer.render(images=images, audio_path=audio_paths[index], output_path=output_path)
+        except Exception as exc:
+            logging.exception("[VIDEO] Failed to render video: %s", exc)
+            raise
 
 
 if __name__ == "__main__":
@@ -2,18 +2,42 @@
 from __future__ import annotations
 
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+SUPPORTED_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg"})
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "2160p": (3840, 2160),
+}
+
+
+def parse_resolution(resolution: str) -> Tuple[int, int]:
+    """Translate a resolution label such as "1080p" into a (width, height) frame size."""
+    try:
+        return RESOLUTIONS[resolution.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported resolution: {resolution}") from None
 
 
 class AssetManager:
     """Manage image assets and output directories."""
 
-    def __init__(self, assets_dir: str, output_dir: str, temp_dir: str) -> None:
-        """Initialize the AssetManager with directory paths."""
+    def __init__(self, assets_dir: str, output_dir: str, temp_dir: str, resolution: str = "1080p") -> None:
+        """Initialize the AssetManager with directory paths and the target video resolution."""
         self.assets_dir = Path(assets_dir)
         self.output_dir = Path(output_dir)
         self.temp_dir = Path(temp_dir)
+        self.frame_size = parse_resolution(resolution)
+        self._images_mtime: Optional[int] = None
+        self._images: List[Path] = []
 
     def ensure_directories(self) -> None:
         """Create required directories if they do not exist."""
@@ -22,11 +46,44 @@ class AssetManager:
         logging.info("[ASSETS] Directories ensured: %s", self.assets_dir)
 
     def list_images(self) -> List[Path]:
-        """List available images in the assets directory."""
-        supported = {".png", ".jpg", ".jpeg"}
-        images = [p for p in self.assets_dir.iterdir() if p.suffix.lower() in supported]
+        """List available images in the assets directory, reusing the last scan if unchanged."""
+        mtime = os.stat(self.assets_dir).st_mtime_ns
+        if mtime == self._images_mtime:
+            return list(self._images)
+        with os.scandir(self.assets_dir) as entries:
+            images = [
+                Path(entry.path)
+                for entry in entries
+                if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file()
+            ]
+        self._images_mtime = mtime
+        self._images = images
         logging.info("[ASSETS] Found %d images", len(images))
-        return images
+        return list(images)
+
+    def prepare_images(self, images: List[Path]) -> List[Path]:
+        """Scale and crop images to the video frame size once, caching the results in the temp directory."""
+        if not images:
+            return []
+        # Pillow releases the GIL while decoding and resampling, so threads prepare the images in parallel.
+        with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1)) as executor:
+            prepared = list(executor.map(self._prepare_image, images))
+        logging.info("[ASSETS] Prepared %d images at %dx%d", len(prepared), *self.frame_size)
+        return prepared
+
+    def _prepare_image(self, image: Path) -> Path:
+        width, height = self.frame_size
+        prepared = self.temp_dir / f"{image.name}.{width}x{height}.jpg"
+        if prepared.exists() and prepared.stat().st_mtime_ns >= image.stat().st_mtime_ns:
+            return prepared
+        with Image.open(image) as source:
+            frame = ImageOps.fit(
+                ImageOps.exif_transpose(source).convert("RGB"),
+                self.frame_size,
+                method=Image.Resampling.LANCZOS,
+            )
+        frame.save(prepared, "JPEG", quality=90)
+        return prepared
 
     def build_output_path(self, filename: str) -> Path:
         """Build a path within the output directory."""
@@ -1,25 +1,38 @@
 """LLM client for script generation."""
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import json
 import logging
 import random
+import re
 import threading
 import time
-from contextlib import contextmanager
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterator, Optional
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Union
 
+import orjson
 from decouple import config
-from openai import APIConnectionError, APITimeoutError, OpenAI, RateLimitError
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, RateLimitError
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
 
 DEFAULT_RPM_LIMIT = "<COLE AQUI: requests por minuto do meu Free tier>"
 DEFAULT_TPM_LIMIT = "<COLE AQUI: tokens por minuto do meu Free tier>"
 DEFAULT_RPD_LIMIT = "<COLE AQUI: requests por dia, se existir no painel>"
 DEFAULT_CONCURRENCY_LIMIT = "<COLE AQUI: concorrência máxima, se existir>"
 
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = ".!?;:…"
+
 
 def _parse_int_env(name: str, default_value: str, fallback: int) -> int:
     value = config(name, default=default_value)
@@ -30,8 +43,90 @@ def _parse_int_env(name: str, default_value: str, fallback: int) -> int:
         return fallback
 
 
-def _estimate_tokens(text: str, max_output_tokens: int) -> int:
-    return max(1, len(text) // 4) + max_output_tokens
+def _normalize_prompt(prompt: str) -> str:
+    """Canonicalize case, whitespace and trailing punctuation for cache lookups."""
+    collapsed = _WHITESPACE_RE.sub(" ", prompt).strip().casefold()
+    return collapsed.rstrip(_TRAILING_PUNCTUATION).rstrip()
+
+
+@lru_cache(maxsize=None)
+def _load_system_prompt(path: str) -> str:
+    try:
+        return Path(path).read_text(encoding="utf-8")
+    except OSError as exc:
+        raise ValueError(f"Failed to read system prompt file {path}: {exc}") from exc
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(model: str) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # encoding files are downloaded on first use
+        logging.warning("[LLM] Token encoder unavailable (%s). Using a character-based estimate.", exc)
+        return None
+
+
+def _retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+@dataclass(frozen=True, slots=True)
+class LLMEnvSettings:
+    """LLM settings read from the environment and .env file."""
+
+    openai_api_key: str
+    model: str
+    max_output_tokens: int
+    max_prompt_chars: int
+    max_retries: int
+    rpm_limit: int
+    tpm_limit: int
+    rpd_limit: int
+    concurrency_limit: int
+    cache_ttl: int
+    cache_max_entries: int
+    cache_path: str
+
+
+@lru_cache(maxsize=1)
+def load_llm_env() -> LLMEnvSettings:
+    """Read LLM settings from the environment and .env file once per process."""
+    return LLMEnvSettings(
+        openai_api_key=config("OPENAI_API_KEY", default=""),
+        model=config("OPENAI_MODEL", default="gpt-4o-mini"),
+        max_output_tokens=_parse_int_env("MAX_OUTPUT_TOKENS", "256", 256),
+        max_prompt_chars=_parse_int_env("MAX_PROMPT_CHARS", "2000", 2000),
+        max_retries=_parse_int_env("MAX_RETRIES", "6", 6),
+        rpm_limit=_parse_int_env("RPM_LIMIT", DEFAULT_RPM_LIMIT, 3),
+        tpm_limit=_parse_int_env("TPM_LIMIT", DEFAULT_TPM_LIMIT, 1000),
+        rpd_limit=_parse_int_env("RPD_LIMIT", DEFAULT_RPD_LIMIT, 0),
+        concurrency_limit=_parse_int_env("CONCURRENCY_LIMIT", DEFAULT_CONCURRENCY_LIMIT, 1),
+        cache_ttl=_parse_int_env("CACHE_TTL", "3600", 3600),
+        cache_max_entries=_parse_int_env("CACHE_MAX_ENTRIES", "512", 512),
+        cache_path=config("CACHE_PATH", default="").strip(),
+    )
 
 
 @dataclass
@@ -41,11 +136,21 @@ class CacheEntry:
 
 
 class ResponseCache:
-    def __init__(self, ttl_seconds: int, disk_path: Optional[Path]) -> None:
+    def __init__(
+        self,
+        ttl_seconds: int,
+        disk_path: Optional[Path],
+        max_entries: int = 512,
+        flush_delay: float = 0.25,
+    ) -> None:
         self._ttl_seconds = ttl_seconds
         self._disk_path = disk_path
+        self._max_entries = max(1, max_entries)
+        self._flush_delay = flush_delay
         self._lock = threading.Lock()
-        self._cache: Dict[str, CacheEntry] = {}
+        self._io_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
         if self._disk_path:
             self._load_disk_cache()
 
@@ -53,8 +158,8 @@ class ResponseCache:
         if not self._disk_path or not self._disk_path.exists():
             return
         try:
-            payload = json.loads(self._disk_path.read_text(encoding="utf-8"))
-        except (OSError, json.JSONDecodeError) as exc:
+            payload = orjson.loads(self._disk_path.read_bytes())
+        except (OSError, orjson.JSONDecodeError) as exc:
             logging.warning("[LLM] Failed to load cache file: %s", exc)
             return
         now = time.time()
@@ -62,33 +167,63 @@ class ResponseCache:
             expires_at = entry.get("expires_at", 0.0)
             if expires_at > now:
                 self._cache[key] = CacheEntry(expires_at=expires_at, value=entry.get("value", ""))
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
 
-    def _persist(self) -> None:
+    def _schedule_persist(self) -> None:
+        # Called with self._lock held. Writes are debounced onto a timer thread so get/set
+        # never wait on disk I/O; the timer is non-daemon, so pending writes finish before exit.
+        if not self._disk_path or self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self._flush_delay, self.flush)
+        self._flush_timer.start()
+
+    def _persist(self, entries: Dict[str, CacheEntry]) -> None:
         if not self._disk_path:
             return
-        payload = {key: {"expires_at": entry.expires_at, "value": entry.value} for key, entry in self._cache.items()}
+        tmp_path = self._disk_path.with_name(f"{self._disk_path.name}.tmp")
         try:
             self._disk_path.parent.mkdir(parents=True, exist_ok=True)
-            self._disk_path.write_text(json.dumps(payload), encoding="utf-8")
+            # orjson serializes the CacheEntry dataclasses natively.
+            tmp_path.write_bytes(orjson.dumps(entries))
+            tmp_path.replace(self._disk_path)
         except OSError as exc:
             logging.warning("[LLM] Failed to write cache file: %s", exc)
 
+    def flush(self) -> None:
+        """Write pending changes to disk immediately."""
+        with self._io_lock:
+            with self._lock:
+                if self._flush_timer is None:
+                    return
+                self._flush_timer.cancel()
+                self._flush_timer = None
+                entries = self._cache.copy()
+            self._persist(entries)
+
     def get(self, key: str) -> Optional[str]:
-        now = time.time()
-        with self._lock:
-            entry = self._cache.get(key)
-            if not entry or entry.expires_at <= now:
-                if entry:
-                    self._cache.pop(key, None)
-                    self._persist()
-                return None
-            return entry.value
+        # A single dict lookup is atomic under the GIL, so hits never take the lock.
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            with self._lock:
+                if self._cache.get(key) is entry:
+                    del self._cache[key]
+                    self._schedule_persist()
+            return None
+        return entry.value
 
     def set(self, key: str, value: str) -> None:
         expires_at = time.time() + self._ttl_seconds
         with self._lock:
             self._cache[key] = CacheEntry(expires_at=expires_at, value=value)
-            self._persist()
+            self._cache.move_to_end(key)
+            self._evict()
+            self._schedule_persist()
 
 
 class RateLimiter:
@@ -99,34 +234,40 @@ class RateLimiter:
         self._concurrency = max(1, concurrency_limit)
         self._request_tokens = float(self._rpm_limit)
         self._token_tokens = float(self._tpm_limit)
-        self._last_refill = time.time()
+        # Refill rates in tokens per nanosecond of monotonic time.
+        self._rpm_rate = self._rpm_limit / 60e9
+        self._tpm_rate = self._tpm_limit / 60e9
+        self._last_refill = time.monotonic_ns()
         self._lock = threading.Lock()
-        self._semaphore = threading.Semaphore(self._concurrency)
-        self._day = time.strftime("%Y-%m-%d")
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        # Local-day index as a plain integer: no strftime/locale work on the acquire path.
+        self._utc_offset = time.localtime().tm_gmtoff
+        self._day = self._current_day()
         self._daily_requests = 0
 
+    def _current_day(self) -> int:
+        return int(time.time() + self._utc_offset) // 86400
+
     def _refill(self) -> None:
-        now = time.time()
+        now = time.monotonic_ns()
         elapsed = now - self._last_refill
-        if elapsed <= 0:
-            return
-        self._request_tokens = min(self._rpm_limit, self._request_tokens + (self._rpm_limit / 60.0) * elapsed)
-        self._token_tokens = min(self._tpm_limit, self._token_tokens + (self._tpm_limit / 60.0) * elapsed)
+        self._request_tokens = min(self._rpm_limit, self._request_tokens + elapsed * self._rpm_rate)
+        self._token_tokens = min(self._tpm_limit, self._token_tokens + elapsed * self._tpm_rate)
         self._last_refill = now
 
     def _check_daily_reset(self) -> None:
-        current_day = time.strftime("%Y-%m-%d")
+        current_day = self._current_day()
         if current_day != self._day:
             self._day = current_day
             self._daily_requests = 0
 
-    @contextmanager
-    def acquire(self, tokens_needed: int) -> Iterator[None]:
+    @asynccontextmanager
+    async def acquire(self, tokens_needed: int) -> AsyncIterator[None]:
         if tokens_needed > self._tpm_limit:
             raise RuntimeError(
                 "Estimated tokens exceed TPM limit. Reduce MAX_OUTPUT_TOKENS or prompt size."
             )
-        self._semaphore.acquire()
+        await self._semaphore.acquire()
         try:
             while True:
                 with self._lock:
@@ -145,7 +286,7 @@ class RateLimiter:
                 wait_tokens = (deficit_tokens / self._tpm_limit) * 60.0 if deficit_tokens else 0.0
                 wait_time = max(wait_request, wait_tokens, 0.25)
                 logging.info("[LLM] Rate limit reached. Waiting %.2fs", wait_time)
-                time.sleep(wait_time)
+                await asyncio.sleep(wait_time)
             yield
         finally:
             self._semaphore.release()
@@ -154,27 +295,50 @@ class RateLimiter:
 class LLMEngine:
     """Client for generating scripts using OpenAI."""
 
-    def __init__(self, model: str, max_tokens: int, temperature: float) -> None:
+    def __init__(
+        self,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        system_prompt_path: Optional[str] = None,
+        env: Optional[LLMEnvSettings] = None,
+    ) -> None:
         """Initialize the LLM client with configuration."""
-        api_key = config("OPENAI_API_KEY", default="")
-        if not api_key:
+        env = env or load_llm_env()
+        if not env.openai_api_key:
             raise ValueError("OPENAI_API_KEY is not configured.")
 
-        self._client = OpenAI(api_key=api_key)
+        self._client = AsyncOpenAI(api_key=env.openai_api_key)
         self._model = model
         self._max_tokens = max_tokens
         self._temperature = temperature
-        self._max_prompt_chars = _parse_int_env("MAX_PROMPT_CHARS", "2000", 2000)
-        self._max_retries = _parse_int_env("MAX_RETRIES", "6", 6)
-        self._rpm_limit = _parse_int_env("RPM_LIMIT", DEFAULT_RPM_LIMIT, 3)
-        self._tpm_limit = _parse_int_env("TPM_LIMIT", DEFAULT_TPM_LIMIT, 1000)
-        self._rpd_limit = _parse_int_env("RPD_LIMIT", DEFAULT_RPD_LIMIT, 0)
-        self._concurrency_limit = _parse_int_env("CONCURRENCY_LIMIT", DEFAULT_CONCURRENCY_LIMIT, 1)
-        self._cache_ttl = _parse_int_env("CACHE_TTL", "3600", 3600)
-        cache_path = config("CACHE_PATH", default="").strip()
+        # Loaded on first generate_scripts call: tiktoken may download its BPE file, which must not block the loop.
+        self._encoding: Optional[Any] = None
+        self._encoding_loaded = False
+        self._count_tokens = lru_cache(maxsize=256)(self._encoded_length)
+        # The system prompt must stay byte-identical across calls so OpenAI's prefix cache can match it.
+        self._system_prompt = _load_system_prompt(system_prompt_path) if system_prompt_path else ""
+        self._system_messages = (
+            [{"role": "system", "content": self._system_prompt}] if self._system_prompt else []
+        )
+        self._system_prompt_tokens = 0
+        # Model parameters and system prompt never change per instance, so they are hashed once
+        # and the hasher is copied per key.
+        self._cache_key_hasher = hashlib.blake2b(
+            f"{model}\x1f{max_tokens}\x1f{temperature}\x1f{self._system_prompt}\x1f".encode("utf-8"),
+            digest_size=16,
+        )
+        self._max_prompt_chars = env.max_prompt_chars
+        self._half_prompt_chars = self._max_prompt_chars // 2
+        self._max_retries = env.max_retries
+        self._rpm_limit = env.rpm_limit
+        self._tpm_limit = env.tpm_limit
+        self._rpd_limit = env.rpd_limit
+        self._concurrency_limit = env.concurrency_limit
         self._cache = ResponseCache(
-            ttl_seconds=self._cache_ttl,
-            disk_path=Path(cache_path) if cache_path else None,
+            ttl_seconds=env.cache_ttl,
+            disk_path=Path(env.cache_path) if env.cache_path else None,
+            max_entries=env.cache_max_entries,
         )
         self._rate_limiter = RateLimiter(
             rpm_limit=self._rpm_limit,
@@ -184,51 +348,101 @@ class LLMEngine:
         )
 
     def _prepare_prompt(self, prompt: str) -> str:
-        if len(prompt) <= self._max_prompt_chars:
+        length = len(prompt)
+        if length <= self._max_prompt_chars:
             return prompt
-        logging.info("[LLM] Prompt too long (%s chars). Truncating.", len(prompt))
-        head = prompt[: self._max_prompt_chars // 2]
-        tail = prompt[-self._max_prompt_chars // 2 :]
-        return f"{head}\n...\n{tail}"
+        logging.info("[LLM] Prompt too long (%s chars). Truncating.", length)
+        # Slice from an explicit index: `-max // 2` floors to one extra character for odd limits.
+        return f"{prompt[: self._half_prompt_chars]}\n...\n{prompt[length - self._half_prompt_chars :]}"
 
     def _cache_key(self, prompt: str) -> str:
-        payload = json.dumps(
-            {
-                "prompt": prompt,
-                "model": self._model,
-                "max_tokens": self._max_tokens,
-                "temperature": self._temperature,
-            },
-            sort_keys=True,
-        ).encode("utf-8")
-        return hashlib.sha256(payload).hexdigest()
-
-    def generate_script(self, prompt: str) -> str:
+        hasher = self._cache_key_hasher.copy()
+        hasher.update(_normalize_prompt(prompt).encode("utf-8"))
+        return hasher.hexdigest()
+
+    async def generate_script(self, prompt: str) -> str:
         """Generate a script from a given prompt."""
-        prepared_prompt = self._prepare_prompt(prompt)
-        cache_key = self._cache_key(prepared_prompt)
-        cached = self._cache.get(cache_key)
-        if cached:
-            logging.info("[LLM] Cache hit for prompt.")
-            return cached
-
-        estimated_tokens = _estimate_tokens(prepared_prompt, self._max_tokens)
+        scripts = await self.generate_scripts([prompt])
+        return scripts[0]
+
+    async def generate_scripts(
+        self, prompts: List[str], return_exceptions: bool = False
+    ) -> List[Union[str, BaseException]]:
+        """Generate one script per prompt, sending all cache misses concurrently under the rate limiter.
+
+        With return_exceptions=True a failed prompt yields its exception instead of cancelling the others.
+        """
+        prepared_prompts = [self._prepare_prompt(prompt) for prompt in prompts]
+        cache_keys = [self._cache_key(prompt) for prompt in prepared_prompts]
+        scripts: List[Optional[str]] = []
+        pending: Dict[str, str] = {}
+        for cache_key, prepared_prompt in zip(cache_keys, prepared_prompts):
+            cached = self._cache.get(cache_key)
+            if cached:
+                logging.info("[LLM] Cache hit for prompt.")
+            else:
+                pending.setdefault(cache_key, prepared_prompt)
+            scripts.append(cached)
+
+        if pending:
+            await self._ensure_encoding()
+            contents = await self._complete(pending, return_exceptions)
+            generated = dict(zip(pending, contents))
+            scripts = [script or generated[key] for script, key in zip(scripts, cache_keys)]
+        return scripts
+
+    async def _ensure_encoding(self) -> None:
+        if self._encoding_loaded:
+            return
+        self._encoding = await asyncio.to_thread(_load_encoding, self._model)
+        self._encoding_loaded = True
+        self._count_tokens.cache_clear()
+        self._system_prompt_tokens = self._count_tokens(self._system_prompt) if self._system_prompt else 0
+
+    def _encoded_length(self, text: str) -> int:
+        if self._encoding is None:
+            return max(1, len(text) // 4)
+        return len(self._encoding.encode(text))
+
+    def _estimate_request_tokens(self, prepared_prompt: str) -> int:
+        return self._count_tokens(prepared_prompt) + self._max_tokens + self._system_prompt_tokens
+
+    async def _complete(
+        self, pending: Dict[str, str], return_exceptions: bool
+    ) -> List[Union[str, BaseException]]:
         logging.info(
-            "[LLM] Generating script. Estimated tokens=%s, max_output_tokens=%s",
-            estimated_tokens,
+            "[LLM] Generating %s script(s). max_output_tokens=%s",
+            len(pending),
             self._max_tokens,
         )
+        # Each prompt is rate-limited and retried on its own, so a 429 only resends that request and
+        # the limiter's semaphore keeps at most CONCURRENCY_LIMIT calls in flight.
+        tasks = [
+            asyncio.ensure_future(self._complete_one(cache_key, prompt)) for cache_key, prompt in pending.items()
+        ]
+        if return_exceptions:
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _complete_one(self, cache_key: str, prepared_prompt: str) -> str:
+        estimated_tokens = self._estimate_request_tokens(prepared_prompt)
         attempt = 0
         while True:
-            with self._rate_limiter.acquire(estimated_tokens):
+            async with self._rate_limiter.acquire(estimated_tokens):
                 try:
-                    response = self._client.chat.completions.create(
+                    response = await self._client.chat.completions.create(
                         model=self._model,
-                        messages=[{"role": "user", "content": prepared_prompt}],
+                        messages=[*self._system_messages, {"role": "user", "content": prepared_prompt}],
                         max_tokens=self._max_tokens,
                         temperature=self._temperature,
                     )
                     content = response.choices[0].message.content.strip()
+                    # Cached right away so a sibling failure cannot discard an already-paid response.
                     self._cache.set(cache_key, content)
                     return content
                 except RateLimitError as exc:
@@ -237,11 +451,9 @@ class LLMEngine:
                         message = "OpenAI rate limit exceeded after retries."
                         logging.error("[LLM] %s", message)
                         raise RuntimeError(message) from exc
-                    retry_after = None
-                    if exc.response is not None:
-                        retry_after = exc.response.headers.get("Retry-After")
-                    if retry_after:
-                        wait_time = float(retry_after)
+                    retry_after = _retry_after_seconds(exc.response.headers) if exc.response is not None else None
+                    if retry_after is not None:
+                        wait_time = retry_after
                     else:
                         base = 0.5 * (2 ** (attempt - 1))
                         wait_time = base + random.uniform(0, base)
@@ -251,19 +463,24 @@ class LLMEngine:
                         attempt,
                         self._max_retries,
                     )
-                    time.sleep(wait_time)
                 except (APIConnectionError, APITimeoutError) as exc:
                     message = "OpenAI request failed due to a network timeout."
                     logging.error("[LLM] %s", message)
                     raise RuntimeError(message) from exc
+            # Back off outside the limiter so the slot is free for other prompts meanwhile.
+            await asyncio.sleep(wait_time)
 
 
-def build_llm_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract LLM settings from a settings dictionary."""
+def build_llm_settings(settings: Dict[str, Any], base_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """Extract LLM settings from a settings dictionary, resolving relative paths against base_dir."""
     llm_settings = settings.get("llm", {})
-    env_max_tokens = _parse_int_env("MAX_OUTPUT_TOKENS", "256", 256)
+    env = load_llm_env()
+    system_prompt_path = llm_settings.get("system_prompt_path")
+    if system_prompt_path and base_dir is not None:
+        system_prompt_path = str(base_dir / system_prompt_path)
     return {
-        "model": config("OPENAI_MODEL", default="gpt-4o-mini"),
-        "max_tokens": int(llm_settings.get("max_tokens", env_max_tokens)),
+        "model": env.model,
+        "max_tokens": int(llm_settings.get("max_tokens", env.max_output_tokens)),
         "temperature": llm_settings.get("temperature", 0.7),
+        "system_prompt_path": system_prompt_path,
     }
@@ -1,21 +1,48 @@
 """Pexels API client utilities."""
 from __future__ import annotations
 
-import json
 import logging
 from pathlib import Path
 from typing import Dict, List
-from urllib.error import HTTPError, URLError
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SEARCH_URL = "https://api.pexels.com/v1/search"
+POOL_SIZE = 16
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 
 
 class PexelsClient:
     """Simple Pexels API client for fetching photos."""
 
     def __init__(self, api_key: str) -> None:
-        """Initialize the client with a Pexels API key."""
+        """Initialize the client with a Pexels API key and a pooled HTTP session."""
         self.api_key = api_key.strip()
+        self._session = requests.Session()
+        self._session.headers.update(self._build_headers())
+        retries = Retry(
+            total=3,
+            backoff_factor=2,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False,
+        )
+        self._session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retries),
+        )
+
+    def __enter__(self) -> PexelsClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release pooled connections."""
+        self._session.close()
 
     def _build_headers(self) -> Dict[str, str]:
         """Build headers for Pexels API requests."""
@@ -27,35 +54,36 @@ class PexelsClient:
 
     def search_photos(self, query: str, per_page: int = 6, orientation: str = "landscape") -> List[Dict]:
         """Search for photos and return the raw photo entries."""
-        params = urlencode({"query": query, "per_page": per_page, "orientation": orientation})
-        url = f"https://api.pexels.com/v1/search?{params}"
-        request = Request(url, headers=self._build_headers())
+        params = {"query": query, "per_page": per_page, "orientation": orientation}
         logging.info("[PEXELS] Searching photos: query=%s per_page=%s", query, per_page)
         try:
-            with urlopen(request, timeout=30) as response:
-                payload = json.loads(response.read().decode("utf-8"))
-        except HTTPError as exc:
-            logging.warning("[PEXELS] Search failed (status=%s): %s", exc.code, exc)
+            response = self._session.get(SEARCH_URL, params=params, timeout=30)
+            response.raise_for_status()
+            payload = response.json()
+        except requests.HTTPError as exc:
+            logging.warning("[PEXELS] Search failed (status=%s): %s", exc.response.status_code, exc)
             return []
-        except URLError as exc:
-            logging.warning("[PEXELS] Search failed: %s", exc)
-            return []
-        except json.JSONDecodeError as exc:
+        except requests.JSONDecodeError as exc:
             logging.warning("[PEXELS] Invalid JSON response: %s", exc)
             return []
+        except requests.RequestException as exc:
+            logging.warning("[PEXELS] Search failed: %s", exc)
+            return []
         return payload.get("photos", [])
 
     def download_photo(self, url: str, destination: Path) -> None:
-        """Download a photo to the destination path."""
-        request = Request(url, headers=self._build_headers())
+        """Stream a photo to the destination path, whose directory must already exist."""
         try:
-            with urlopen(request, timeout=60) as response:
-                destination.parent.mkdir(parents=True, exist_ok=True)
-                destination.write_bytes(response.read())
-        except HTTPError as exc:
-            logging.warning("[PEXELS] Download failed (status=%s): %s", exc.code, exc)
+            with self._session.get(url, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                with destination.open("wb") as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        file.write(chunk)
+        except requests.HTTPError as exc:
+            logging.warning("[PEXELS] Download failed (status=%s): %s", exc.response.status_code, exc)
             return
-        except URLError as exc:
+        except requests.RequestException as exc:
+            destination.unlink(missing_ok=True)
             logging.warning("[PEXELS] Download failed: %s", exc)
             return
         logging.info("[PEXELS] Downloaded %s", destination)
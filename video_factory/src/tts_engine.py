@@ -6,7 +6,6 @@ import logging
 from dataclasses import dataclass
 from typing import Any, Dict
 
-import yaml
 from decouple import config
 
 from src.interfaces import TTSProvider
@@ -62,15 +61,8 @@ class ElevenProvider:
         await asyncio.to_thread(_sync_generate)
 
 
-def load_settings(settings_path: str) -> Dict[str, Any]:
-    """Load YAML settings from a given path."""
-    with open(settings_path, "r", encoding="utf-8") as file:
-        return yaml.safe_load(file)
-
-
-def tts_factory(settings_path: str) -> TTSProvider:
-    """Instantiate the configured TTS provider based on settings.yaml."""
-    settings = load_settings(settings_path)
+def tts_factory(settings: Dict[str, Any]) -> TTSProvider:
+    """Instantiate the configured TTS provider from the loaded settings.yaml."""
     provider = settings.get("tts_provider_active", "edge").lower()
 
     if provider == "elevenlabs":
@@ -1,11 +1,38 @@
-"""Video rendering module using MoviePy."""
+"""Video rendering module using FFmpeg."""
 from __future__ import annotations
 
 import logging
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Set
 
-from moviepy.editor import AudioFileClip, ImageClip, concatenate_videoclips
+from src.asset_manager import parse_resolution
+
+HARDWARE_ENCODER = "h264_nvenc"
+SOFTWARE_ENCODER = "libx264"
+
+# Encoders that failed to encode in this process; they are listed by -encoders but unusable here.
+_failed_encoders: Set[str] = set()
+
+
+@lru_cache(maxsize=None)
+def _has_encoder(ffmpeg: str, encoder: str) -> bool:
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-encoders"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return f" {encoder} " in result.stdout
+
+
+def _concat_entry(image: Path) -> str:
+    # The concat demuxer quotes paths in single quotes; embedded quotes are closed, escaped and reopened.
+    escaped = str(image.resolve()).replace("'", "'\\''")
+    return f"file '{escaped}'"
 
 
 class VideoRenderer:
@@ -16,25 +43,86 @@ class VideoRenderer:
         self.resolution = resolution
         self.fps = fps
         self.image_duration = image_duration
+        self.frame_size = parse_resolution(resolution)
+
+    def build_concat_list(self, images: List[Path]) -> str:
+        """Build an FFmpeg concat demuxer script showing each image for image_duration seconds."""
+        lines = []
+        for image in images:
+            lines.append(_concat_entry(image))
+            lines.append(f"duration {self.image_duration}")
+        # The demuxer ignores the last duration unless the final file is listed again.
+        lines.append(_concat_entry(images[-1]))
+        return "\n".join(lines) + "\n"
+
+    def build_command(
+        self,
+        ffmpeg: str,
+        concat_path: Path,
+        audio_path: Path,
+        output_path: Path,
+        video_codec: str,
+        total_duration: float,
+    ) -> List[str]:
+        """Build the FFmpeg command line that encodes the slideshow with narration."""
+        width, height = self.frame_size
+        return [
+            ffmpeg,
+            "-y",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(concat_path),
+            "-i",
+            str(audio_path),
+            "-map",
+            "0:v",
+            "-map",
+            "1:a",
+            "-vf",
+            f"scale={width}:{height},setsar=1,fps={self.fps},format=yuv420p",
+            "-c:v",
+            video_codec,
+            "-c:a",
+            "aac",
+            "-t",
+            str(total_duration),
+            str(output_path),
+        ]
 
     def render(self, images: List[Path], audio_path: Path, output_path: Path) -> None:
         """Render a video from images and a narration audio file."""
         if not images:
             raise ValueError("No images available for rendering.")
 
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is not installed or not on PATH.")
+
         logging.info("[VIDEO] Rendering video with %d images", len(images))
-        audio_clip = AudioFileClip(str(audio_path))
+        codecs = [SOFTWARE_ENCODER]
+        if HARDWARE_ENCODER not in _failed_encoders and _has_encoder(ffmpeg, HARDWARE_ENCODER):
+            codecs.insert(0, HARDWARE_ENCODER)
+        total_duration = len(images) * self.image_duration
 
-        clips = [
-            ImageClip(str(image)).set_duration(self.image_duration)
-            for image in images
-        ]
-        video_clip = concatenate_videoclips(clips, method="compose")
-        video_clip = video_clip.set_audio(audio_clip)
-        video_clip.write_videofile(
-            str(output_path),
-            fps=self.fps,
-            codec="libx264",
-            audio_codec="aac",
-        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            concat_path = Path(tmp_dir) / "images.txt"
+            concat_path.write_text(self.build_concat_list(images), encoding="utf-8")
+            for codec in codecs:
+                command = self.build_command(ffmpeg, concat_path, audio_path, output_path, codec, total_duration)
+                try:
+                    subprocess.run(command, capture_output=True, text=True, check=True)
+                    break
+                except subprocess.CalledProcessError as exc:
+                    if codec == codecs[-1]:
+                        raise RuntimeError(f"ffmpeg failed: {exc.stderr.strip()}") from exc
+                    # NVENC is listed whenever FFmpeg was built with it, even without a usable GPU,
+                    # so a failure is remembered and later renders go straight to the software encoder.
+                    _failed_encoders.add(codec)
+                    logging.warning("[VIDEO] %s encoding failed. Falling back to %s.", codec, SOFTWARE_ENCODER)
         logging.info("[VIDEO] Video saved at %s", output_path)
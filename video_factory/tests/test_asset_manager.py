@@ -0,0 +1,50 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from PIL import Image
+
+from src.asset_manager import AssetManager
+
+
+class TestAssetManager(TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        root = Path(self._tmp.name)
+        self.manager = AssetManager(
+            assets_dir=str(root / "assets"),
+            output_dir=str(root / "output"),
+            temp_dir=str(root / "temp"),
+        )
+        self.manager.ensure_directories()
+
+    def test_list_images_filters_supported_files(self) -> None:
+        (self.manager.assets_dir / "a.JPG").write_bytes(b"")
+        (self.manager.assets_dir / "b.png").write_bytes(b"")
+        (self.manager.assets_dir / "notes.txt").write_bytes(b"")
+        (self.manager.assets_dir / "folder.jpg").mkdir()
+
+        names = sorted(path.name for path in self.manager.list_images())
+
+        self.assertEqual(names, ["a.JPG", "b.png"])
+
+    def test_list_images_rescans_after_directory_changes(self) -> None:
+        self.assertEqual(self.manager.list_images(), [])
+        (self.manager.assets_dir / "new.jpeg").write_bytes(b"")
+
+        self.assertEqual([path.name for path in self.manager.list_images()], ["new.jpeg"])
+
+    def test_prepare_images_fits_frame_size_and_reuses_cache(self) -> None:
+        source = self.manager.assets_dir / "photo.png"
+        Image.new("RGB", (400, 400), "red").save(source)
+
+        first = self.manager.prepare_images([source])
+        mtime = first[0].stat().st_mtime_ns
+        second = self.manager.prepare_images([source])
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0].parent, self.manager.temp_dir)
+        self.assertEqual(second[0].stat().st_mtime_ns, mtime)
+        with Image.open(first[0]) as prepared:
+            self.assertEqual(prepared.size, (1920, 1080))
@@ -1,56 +1,245 @@
-from unittest import TestCase
-from unittest.mock import Mock, patch
+import asyncio
+import dataclasses
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock
 
-import httpx
-from openai import RateLimitError
+import src.llm_engine as llm_engine
+from src.llm_engine import (
+    LLMEngine,
+    LLMEnvSettings,
+    ResponseCache,
+    _retry_after_seconds,
+    build_llm_settings,
+)
 
-from src.llm_engine import LLMEngine
 
+@lru_cache(maxsize=None)
+def build_rate_limit_error(retry_after_ms: str | None = None) -> Exception:
+    import httpx
+    from openai import RateLimitError
 
-def build_rate_limit_error() -> RateLimitError:
     request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
-    response = httpx.Response(429, request=request)
+    headers = {"retry-after-ms": retry_after_ms} if retry_after_ms is not None else None
+    response = httpx.Response(429, request=request, headers=headers)
     return RateLimitError("quota", response=response, body=None)
 
 
-class TestLLMEngine(TestCase):
-    def _config_side_effect(self, key: str, default: str = "") -> str:
-        overrides = {
-            "OPENAI_API_KEY": "test-key",
-            "MAX_RETRIES": "0",
-            "RPM_LIMIT": "100",
-            "TPM_LIMIT": "10000",
-            "RPD_LIMIT": "0",
-            "CONCURRENCY_LIMIT": "1",
-            "CACHE_TTL": "3600",
-            "MAX_PROMPT_CHARS": "2000",
-        }
-        return overrides.get(key, default)
-
-    def test_generate_script_raises_runtime_error_on_rate_limit(self) -> None:
-        mock_client = Mock()
-        mock_client.chat.completions.create.side_effect = build_rate_limit_error()
-
-        with patch("src.llm_engine.config", side_effect=self._config_side_effect):
-            with patch("src.llm_engine.OpenAI", return_value=mock_client):
-                engine = LLMEngine(model="gpt-4o-mini", max_tokens=10, temperature=0.1)
-                with self.assertRaises(RuntimeError) as context:
-                    engine.generate_script("teste")
-
-        self.assertIn("rate limit exceeded", str(context.exception).lower())
-
-    def test_generate_script_uses_cache(self) -> None:
-        mock_client = Mock()
-        mock_client.chat.completions.create.return_value.choices = [
-            Mock(message=Mock(content="resultado"))
-        ]
-
-        with patch("src.llm_engine.config", side_effect=self._config_side_effect):
-            with patch("src.llm_engine.OpenAI", return_value=mock_client):
-                engine = LLMEngine(model="gpt-4o-mini", max_tokens=10, temperature=0.1)
-                first = engine.generate_script("teste cache")
-                second = engine.generate_script("teste cache")
+TEST_ENV = LLMEnvSettings(
+    openai_api_key="test-key",
+    model="gpt-4o-mini",
+    max_output_tokens=10,
+    max_prompt_chars=2000,
+    max_retries=0,
+    rpm_limit=100,
+    tpm_limit=10000,
+    rpd_limit=0,
+    concurrency_limit=1,
+    cache_ttl=3600,
+    cache_max_entries=512,
+    cache_path="",
+)
+
+
+class FakeEncoding:
+    def encode(self, text: str) -> list[str]:
+        return text.split()
+
+
+class TestLLMEngine(IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.mock_create = AsyncMock()
+        cls.mock_create.return_value.choices = [Mock(message=Mock(content="resultado"))]
+        cls.mock_client = Mock()
+        cls.mock_client.chat.completions.create = cls.mock_create
+        cls._original_async_openai = llm_engine.AsyncOpenAI
+        llm_engine.AsyncOpenAI = Mock(return_value=cls.mock_client)
+        # Keeps tiktoken from downloading its encoding files during tests.
+        cls.mock_load_encoding = Mock(return_value=None)
+        cls._original_load_encoding = llm_engine._load_encoding
+        llm_engine._load_encoding = cls.mock_load_encoding
+        cls.engine = LLMEngine(model="gpt-4o-mini", max_tokens=10, temperature=0.1, env=TEST_ENV)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        llm_engine.AsyncOpenAI = cls._original_async_openai
+        llm_engine._load_encoding = cls._original_load_encoding
+
+    def setUp(self) -> None:
+        # Clears call records and any side_effect; the pre-wired choices on return_value are kept.
+        self.mock_create.reset_mock(side_effect=True)
+        self.mock_load_encoding.return_value = None
+
+    async def test_generate_script_raises_runtime_error_on_rate_limit(self) -> None:
+        self.mock_create.side_effect = build_rate_limit_error()
+
+        with self.assertRaises(RuntimeError) as context:
+            await self.engine.generate_script("teste")
+
+        self.assertRegex(str(context.exception).lower(), r"(rate limit|quota) exceeded")
+
+    async def test_generate_script_uses_cache(self) -> None:
+        first = await self.engine.generate_script("teste cache")
+        second = await self.engine.generate_script("teste cache")
 
         self.assertEqual(first, "resultado")
         self.assertEqual(second, "resultado")
-        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+        self.assertEqual(self.mock_create.call_count, 1)
+
+    async def test_generate_script_cache_ignores_case_and_whitespace(self) -> None:
+        await self.engine.generate_script("Crie um roteiro curto.")
+        cached = await self.engine.generate_script("  crie um  Roteiro curto  ")
+
+        self.assertEqual(cached, "resultado")
+        self.assertEqual(self.mock_create.call_count, 1)
+
+    async def test_generate_script_sends_fixed_system_prompt_first(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            system_prompt_path = Path(tmp_dir) / "system_prompt.txt"
+            system_prompt_path.write_text("Regras fixas.", encoding="utf-8")
+            engine = LLMEngine(
+                model="gpt-4o-mini",
+                max_tokens=10,
+                temperature=0.1,
+                system_prompt_path=str(system_prompt_path),
+                env=TEST_ENV,
+            )
+            await engine.generate_script("teste sistema")
+
+        messages = self.mock_create.call_args.kwargs["messages"]
+        self.assertEqual(messages[0], {"role": "system", "content": "Regras fixas."})
+        self.assertEqual(messages[1], {"role": "user", "content": "teste sistema"})
+
+    async def test_generate_scripts_sends_only_cache_misses(self) -> None:
+        await self.engine.generate_script("canal a")
+        scripts = await self.engine.generate_scripts(["canal a", "canal b", "canal c", "canal b"])
+
+        self.assertEqual(scripts, ["resultado"] * 4)
+        self.assertEqual(self.mock_create.call_count, 3)
+
+    async def test_generate_scripts_retries_only_rate_limited_prompt_within_concurrency(self) -> None:
+        engine = LLMEngine(
+            model="gpt-4o-mini",
+            max_tokens=10,
+            temperature=0.1,
+            env=dataclasses.replace(TEST_ENV, max_retries=1),
+        )
+        sent_prompts = []
+        in_flight = 0
+        max_in_flight = 0
+
+        async def create(**kwargs):
+            nonlocal in_flight, max_in_flight
+            prompt = kwargs["messages"][-1]["content"]
+            sent_prompts.append(prompt)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            if prompt == "lote b" and sent_prompts.count(prompt) == 1:
+                raise build_rate_limit_error("0")
+            return Mock(choices=[Mock(message=Mock(content=prompt))])
+
+        self.mock_create.side_effect = create
+        scripts = await engine.generate_scripts(["lote a", "lote b", "lote c", "lote d"])
+
+        self.assertEqual(scripts, ["lote a", "lote b", "lote c", "lote d"])
+        self.assertEqual(sorted(sent_prompts), ["lote a", "lote b", "lote b", "lote c", "lote d"])
+        self.assertEqual(max_in_flight, TEST_ENV.concurrency_limit)
+
+    async def test_generate_scripts_caches_successes_when_another_prompt_fails(self) -> None:
+        async def create(**kwargs):
+            prompt = kwargs["messages"][-1]["content"]
+            if prompt == "falha b":
+                raise build_rate_limit_error("0")
+            return Mock(choices=[Mock(message=Mock(content=prompt))])
+
+        self.mock_create.side_effect = create
+        scripts = await self.engine.generate_scripts(["falha a", "falha b"], return_exceptions=True)
+        self.assertEqual(scripts[0], "falha a")
+        self.assertIsInstance(scripts[1], RuntimeError)
+
+        with self.assertRaises(RuntimeError):
+            await self.engine.generate_scripts(["falha c", "falha b"])
+        self.assertEqual(await self.engine.generate_script("falha a"), "falha a")
+        self.assertEqual(await self.engine.generate_script("falha c"), "falha c")
+
+        sent_prompts = [call.kwargs["messages"][-1]["content"] for call in self.mock_create.call_args_list]
+        self.assertEqual(sent_prompts.count("falha a"), 1)
+        self.assertEqual(sent_prompts.count("falha c"), 1)
+
+    async def test_estimate_request_tokens_counts_system_prompt_with_encoder(self) -> None:
+        self.mock_load_encoding.return_value = FakeEncoding()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            system_prompt_path = Path(tmp_dir) / "system_prompt.txt"
+            system_prompt_path.write_text("Regras fixas do canal.", encoding="utf-8")
+            engine = LLMEngine(
+                model="gpt-4o-mini",
+                max_tokens=10,
+                temperature=0.1,
+                system_prompt_path=str(system_prompt_path),
+                env=TEST_ENV,
+            )
+        await engine._ensure_encoding()
+
+        self.mock_load_encoding.assert_called_once_with("gpt-4o-mini")
+        self.assertEqual(engine._estimate_request_tokens("um dois três"), 3 + 10 + 4)
+
+    async def test_estimate_request_tokens_falls_back_to_character_count(self) -> None:
+        await self.engine._ensure_encoding()
+
+        self.assertEqual(self.engine._estimate_request_tokens("x" * 40), 40 // 4 + 10)
+
+
+class TestResponseCache(TestCase):
+    def test_set_persists_in_background_and_reloads(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            disk_path = Path(tmp_dir) / "cache.json"
+            cache = ResponseCache(ttl_seconds=60, disk_path=disk_path, flush_delay=60)
+            cache.set("key", "value")
+            self.assertFalse(disk_path.exists())
+
+            cache.flush()
+            reloaded = ResponseCache(ttl_seconds=60, disk_path=disk_path)
+
+        self.assertEqual(reloaded.get("key"), "value")
+
+    def test_set_evicts_least_recently_written_entry(self) -> None:
+        cache = ResponseCache(ttl_seconds=60, disk_path=None, max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.set("a", "1")
+        cache.set("c", "3")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+
+
+class TestRetryAfter(TestCase):
+    def test_prefers_millisecond_header(self) -> None:
+        headers = {"retry-after-ms": "1500", "retry-after": "20"}
+        self.assertEqual(_retry_after_seconds(headers), 1.5)
+
+    def test_parses_seconds_and_ignores_invalid_values(self) -> None:
+        self.assertEqual(_retry_after_seconds({"retry-after": "2"}), 2.0)
+        self.assertIsNone(_retry_after_seconds({"retry-after": "soon"}))
+        self.assertIsNone(_retry_after_seconds({}))
+
+
+class TestBuildLLMSettings(TestCase):
+    def test_resolves_relative_system_prompt_path_against_base_dir(self) -> None:
+        base_dir = Path("/opt/video_factory")
+        settings = {"llm": {"system_prompt_path": "./config/system_prompt.txt"}}
+
+        llm_settings = build_llm_settings(settings, base_dir)
+
+        self.assertEqual(Path(llm_settings["system_prompt_path"]), base_dir / "config" / "system_prompt.txt")
+
+    def test_leaves_system_prompt_disabled_when_not_configured(self) -> None:
+        llm_settings = build_llm_settings({"llm": {}}, Path("/opt/video_factory"))
+
+        self.assertIsNone(llm_settings["system_prompt_path"])
@@ -1,43 +1,62 @@
+import io
 import logging
+import tempfile
 from pathlib import Path
 from unittest import TestCase
-from unittest.mock import patch
-from urllib.error import HTTPError
+from unittest.mock import Mock
+
+import requests
 
 from src.pexels_client import PexelsClient
 
+PHOTO_URL = "https://images.pexels.com/photo.jpg"
+
+
+def build_response(url: str, status_code: int, body: bytes = b"") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "OK" if status_code < 400 else "Forbidden"
+    response.url = url
+    response.raw = io.BytesIO(body)
+    return response
+
 
 class TestPexelsClient(TestCase):
     def setUp(self) -> None:
         self.client = PexelsClient(api_key="test-key")
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.destination = Path(self._tmp.name) / "pexels_test.jpg"
+
+    def test_http_errors_are_logged_and_skipped(self) -> None:
+        self.client._session.get = Mock(return_value=build_response(PHOTO_URL, 403))
+        cases = [
+            ("search", lambda: self.assertEqual(self.client.search_photos(query="tech"), []), "Search failed"),
+            ("download", lambda: self.client.download_photo(PHOTO_URL, self.destination), "Download failed"),
+        ]
+        with self.assertLogs(level=logging.WARNING) as captured:
+            for name, call, _ in cases:
+                with self.subTest(name=name):
+                    call()
+        self.assertFalse(self.destination.exists())
+        for name, _, expected_log in cases:
+            with self.subTest(name=name):
+                self.assertTrue(
+                    any(expected_log in message for message in captured.output),
+                    f"Expected warning log for failed {name}",
+                )
 
-    def test_search_photos_returns_empty_on_http_error(self) -> None:
-        error = HTTPError("https://api.pexels.com/v1/search", 403, "Forbidden", None, None)
-        with patch("src.pexels_client.urlopen", side_effect=error):
-            with self.assertLogs(level=logging.WARNING) as captured:
-                photos = self.client.search_photos(query="tech")
-        self.assertEqual(photos, [])
-        self.assertTrue(
-            any("Search failed" in message for message in captured.output),
-            "Expected warning log for failed search",
-        )
-
-    def test_download_photo_skips_on_http_error(self) -> None:
-        error = HTTPError("https://images.pexels.com/photo.jpg", 403, "Forbidden", None, None)
-        destination = Path("/tmp/pexels_test.jpg")
-        if destination.exists():
-            destination.unlink()
-        with patch("src.pexels_client.urlopen", side_effect=error):
-            with self.assertLogs(level=logging.WARNING) as captured:
-                self.client.download_photo("https://images.pexels.com/photo.jpg", destination)
-        self.assertFalse(destination.exists())
-        self.assertTrue(
-            any("Download failed" in message for message in captured.output),
-            "Expected warning log for failed download",
-        )
+    def test_download_photo_streams_body_to_destination(self) -> None:
+        body = b"x" * 200_000
+        self.client._session.get = Mock(return_value=build_response(PHOTO_URL, 200, body))
+        self.client.download_photo(PHOTO_URL, self.destination)
+        self.assertEqual(self.destination.read_bytes(), body)
 
     def test_build_headers_includes_user_agent_and_auth(self) -> None:
         headers = self.client._build_headers()
         self.assertEqual(headers["Authorization"], "test-key")
         self.assertIn("User-Agent", headers)
         self.assertIn("Accept", headers)
+
+    def test_session_reuses_auth_headers(self) -> None:
+        self.assertEqual(self.client._session.headers["Authorization"], "test-key")
@@ -0,0 +1,85 @@
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import Mock
+
+import src.video_renderer as video_renderer
+from src.video_renderer import VideoRenderer
+
+
+class TestVideoRenderer(TestCase):
+    def setUp(self) -> None:
+        self.renderer = VideoRenderer(resolution="720p", fps=24, image_duration=3)
+        self._original_shutil = video_renderer.shutil
+        self._original_subprocess = video_renderer.subprocess
+        video_renderer._has_encoder.cache_clear()
+        video_renderer._failed_encoders.clear()
+
+    def tearDown(self) -> None:
+        video_renderer.shutil = self._original_shutil
+        video_renderer.subprocess = self._original_subprocess
+        video_renderer._has_encoder.cache_clear()
+        video_renderer._failed_encoders.clear()
+
+    def test_build_concat_list_repeats_last_image(self) -> None:
+        images = [Path("/assets/a.jpg"), Path("/assets/b.jpg")]
+
+        lines = self.renderer.build_concat_list(images).splitlines()
+
+        self.assertEqual(
+            lines,
+            [
+                "file '/assets/a.jpg'",
+                "duration 3",
+                "file '/assets/b.jpg'",
+                "duration 3",
+                "file '/assets/b.jpg'",
+            ],
+        )
+
+    def test_build_concat_list_escapes_single_quotes(self) -> None:
+        lines = self.renderer.build_concat_list([Path("/assets/it's.jpg")]).splitlines()
+
+        self.assertEqual(lines[0], "file '/assets/it'\\''s.jpg'")
+
+    def test_build_command_scales_to_frame_size_and_limits_duration(self) -> None:
+        command = self.renderer.build_command(
+            "ffmpeg",
+            Path("images.txt"),
+            Path("narration.mp3"),
+            Path("out.mp4"),
+            "libx264",
+            6,
+        )
+
+        self.assertIn("scale=1280:720,setsar=1,fps=24,format=yuv420p", command)
+        self.assertEqual(command[command.index("-c:v") + 1], "libx264")
+        self.assertEqual(command[command.index("-t") + 1], "6")
+        self.assertEqual(command[-1], "out.mp4")
+
+    def test_render_raises_when_ffmpeg_is_missing(self) -> None:
+        video_renderer.shutil = Mock(which=Mock(return_value=None))
+
+        with self.assertRaises(RuntimeError):
+            self.renderer.render([Path("/assets/a.jpg")], Path("narration.mp3"), Path("out.mp4"))
+
+    def test_render_falls_back_to_software_encoder_once_per_process(self) -> None:
+        encode_codecs = []
+
+        def run(command, **kwargs):
+            if "-encoders" in command:
+                return Mock(stdout=" V....D h264_nvenc           NVIDIA NVENC H.264 encoder\n")
+            codec = command[command.index("-c:v") + 1]
+            encode_codecs.append(codec)
+            if codec == "h264_nvenc":
+                raise subprocess.CalledProcessError(1, command, stderr="No capable devices found")
+            return Mock()
+
+        video_renderer.shutil = Mock(which=Mock(return_value="/usr/bin/ffmpeg"))
+        video_renderer.subprocess = Mock(run=Mock(side_effect=run), CalledProcessError=subprocess.CalledProcessError)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ("a.mp4", "b.mp4"):
+                self.renderer.render([Path("/assets/a.jpg")], Path("narration.mp3"), Path(tmp_dir) / name)
+
+        self.assertEqual(encode_codecs, ["h264_nvenc", "libx264", "libx264"])